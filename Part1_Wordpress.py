@@ -13,6 +13,7 @@ import logging
 from PIL import Image, ImageDraw, ImageFont
 from io import BytesIO
 import textwrap
+from freshness_scheduler import FreshnessScheduler
 
 # Logging configuration
 logging.basicConfig(
@@ -60,7 +61,8 @@ class OAuthCallbackHandler(BaseHTTPRequestHandler):
 
 class WordPressRSSPublisher:
     """Manages RSS feed monitoring and publishing to a WordPress site."""
-    def __init__(self, site_url, client_id, client_secret, feed_url, bitly_api_key=None, processed_entries_file='processed_entries.pkl'):
+    def __init__(self, site_url, client_id, client_secret, feed_url, bitly_api_key=None, processed_entries_file='processed_entries.pkl',
+                 feed_priority=0, freshness_slo=900, scheduler=None, media_urls_file='media_urls.pkl'):
         """
         Initializes the publisher with the required configuration.
 
@@ -71,6 +73,10 @@ class WordPressRSSPublisher:
             feed_url (str): RSS feed URL.
             bitly_api_key (str, optional): Bitly API key for URL shortening.
             processed_entries_file (str): Path to the file storing processed entries.
+            feed_priority (int): Scheduling priority of the feed's entries.
+            freshness_slo (int): Seconds allowed from an entry's publish time to its post going live.
+            scheduler (FreshnessScheduler, optional): Scheduler to share with other feeds or targets.
+            media_urls_file (str): Path to the file mapping article links to uploaded image URLs.
         """
         self.site_url = site_url.replace('https://', '').replace('http://', '').rstrip('/')
         self.client_id = client_id
@@ -84,6 +90,16 @@ class WordPressRSSPublisher:
         self.bitly_api_key = bitly_api_key
         self.processed_entries_file = processed_entries_file
         self.processed_entries = self.load_processed_entries()
+        self.feed_priority = feed_priority
+        self.freshness_slo = freshness_slo
+        self.scheduler = scheduler or FreshnessScheduler(default_slo=freshness_slo)
+        # Keyed on the site so publishers sharing a scheduler only take their own entries
+        self.target = f"wordpress:{self.site_url}"
+
+        # Public URLs of uploaded featured images, keyed by article link, so
+        # other publishers (e.g. Part2's Instagram poster) can reuse them
+        self.media_urls_file = media_urls_file
+        self.media_urls = self.load_media_urls()
 
     def get_authorization_url(self):
         """
@@ -192,6 +208,38 @@ class WordPressRSSPublisher:
         except Exception as e:
             logging.error(f"Failed to save processed entries: {e}")
 
+    def load_media_urls(self):
+        """
+        Loads the article link to media URL mapping from a file.
+
+        Returns:
+            dict: Media URLs keyed by article link.
+        """
+        try:
+            if os.path.exists(self.media_urls_file) and os.path.getsize(self.media_urls_file) > 0:
+                with open(self.media_urls_file, 'rb') as f:
+                    return dict(pickle.load(f))
+            return {}
+        except Exception:
+            logging.warning("Failed to load media URLs. Starting fresh.")
+            return {}
+
+    def save_media_urls(self, max_entries=1000):
+        """
+        Saves the most recent media URLs to a file.
+
+        Args:
+            max_entries (int): Number of most recently uploaded media URLs to keep.
+        """
+        # Dicts keep insertion order, so the oldest uploads are dropped first
+        for link in list(self.media_urls)[:-max_entries]:
+            del self.media_urls[link]
+        try:
+            with open(self.media_urls_file, 'wb') as f:
+                pickle.dump(list(self.media_urls.items()), f)
+        except Exception as e:
+            logging.error(f"Failed to save media URLs: {e}")
+
     def shorten_url(self, url):
         """
         Shortens a URL using Bitly API.
@@ -253,12 +301,14 @@ class WordPressRSSPublisher:
             logging.error(f"Image generation failed: {e}")
             return None
 
-    def upload_media(self, image):
+    def upload_media(self, image, article_url=None):
         """
         Uploads an image to WordPress as a media file.
 
         Args:
             image (Image): PIL Image object to upload.
+            article_url (str, optional): Link of the article the image belongs
+                to. When given, the media URL is recorded for reuse.
 
         Returns:
             int: Media ID of the uploaded image, or None if upload fails.
@@ -286,6 +336,10 @@ class WordPressRSSPublisher:
             if response.status_code == 200:
                 media_data = response.json()['media'][0]
                 logging.info(f"Image uploaded to WordPress: {media_data['URL']}")
+                if article_url:
+                    self.media_urls.pop(article_url, None)
+                    self.media_urls[article_url] = media_data['URL']
+                    self.save_media_urls()
                 return media_data['ID']
             else:
                 logging.error(f"Failed to upload image: {response.status_code}")
@@ -348,7 +402,8 @@ class WordPressRSSPublisher:
 
     def process_feed(self):
         """
-        Processes the RSS feed and publishes new articles to WordPress.
+        Processes the RSS feed and publishes new articles to WordPress,
+        most urgent first by freshness deadline.
         """
         try:
             feed = feedparser.parse(self.feed_url)
@@ -356,9 +411,18 @@ class WordPressRSSPublisher:
                 logging.warning("No entries found in the RSS feed.")
                 return
             
-            new_entries = [entry for entry in feed.entries if entry.link not in self.processed_entries]
+            self.scheduler.add_feed(
+                feed, self.feed_url, self.target,
+                priority=self.feed_priority,
+                slo=self.freshness_slo,
+                skip=self.processed_entries,
+            )
 
-            for entry in new_entries:
+            while True:
+                item = self.scheduler.pop(self.target)
+                if item is None:
+                    break
+                entry = item.entry
                 print(entry)
                 
                 title = entry.title
@@ -375,12 +439,15 @@ class WordPressRSSPublisher:
                 short_url = self.shorten_url(url)
                 content = f"<p>{summary}</p><p><a href='{short_url}'>Read more</a></p>"
                 image = self.generate_image(title, summary)
-                media_id = self.upload_media(image) if image else None
+                media_id = self.upload_media(image, url) if image else None
                 post_url = self.publish_post(title, content, media_id)
                 
                 if post_url:
                     self.processed_entries.add(entry.link)
                     self.save_processed_entries()
+                    self.scheduler.record_published(item)
+
+            self.scheduler.log_report()
         except Exception as e:
             logging.error(f"Error processing feed: {e}")
 
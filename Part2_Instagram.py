@@ -9,6 +9,13 @@ from PIL import Image, ImageDraw, ImageFont
 from io import BytesIO
 import textwrap
 import random
+from urllib.parse import urlparse
+import re
+import hashlib
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from freshness_scheduler import FreshnessScheduler
 
 # Configurations
 FEED_URL = "http://rss.cnn.com/rss/edition_world.rss"  # CNN RSS feed
@@ -17,6 +24,22 @@ ACCESS_TOKEN = "EAA2wPKwMRSEBO7ldCFAyyAYRHcFBR37aVsRdvrbmJSS2GashBdYhRuYlSTNL2sh
 USER_ID = "17841471034402887"  #Instagram Account ID
 IMGUR_CLIENT_ID = "202495689ba3db5"  # Imgur client ID
 
+# Feeds to monitor. Higher priority feeds go first; slo is the number of seconds
+# allowed between an article being published and it going live on Instagram.
+FEEDS = [
+    {"url": FEED_URL, "priority": 0, "slo": 900},
+]
+INSTAGRAM_TARGET = f"instagram:{USER_ID}"  # Scheduler target for this account
+
+# Image hosting configuration
+IMAGE_HOSTS = ("imgur", "local", "wordpress")
+IMAGE_HOST = "imgur"  # One of IMAGE_HOSTS
+LOCAL_IMAGE_DIR = "hosted_images"  # Directory served by the local image host
+LOCAL_IMAGE_BIND = ("0.0.0.0", 8081)  # Address the local image host listens on
+LOCAL_IMAGE_BASE_URL = None  # Internet-reachable URL of LOCAL_IMAGE_BIND; Graph API fetches images from Meta's servers
+LOCAL_IMAGE_RETENTION = 24 * 60 * 60  # Seconds hosted images are kept after their last use
+WORDPRESS_MEDIA_URLS_FILE = 'media_urls.pkl'  # Written by Part1's WordPressRSSPublisher
+
 # Logging configuration
 logging.basicConfig(
     level=logging.INFO, 
@@ -131,17 +154,23 @@ def generate_image(article_title, article_summary):
         logging.error(f"Image generation failed: {e}")
         return None
 
+def encode_image(image):
+    """Encode image as JPEG once, returning a buffer positioned at the start."""
+    img_buffer = BytesIO()
+    image.save(img_buffer, format='JPEG')
+    img_buffer.seek(0)
+    return img_buffer
+
 def upload_photo_to_imgur(image):
-    """Upload image to Imgur."""
+    """Upload image (PIL Image or encoded JPEG buffer) to Imgur."""
     try:
         imgur_url = "https://api.imgur.com/3/image"
         headers = {"Authorization": f"Client-ID {IMGUR_CLIENT_ID}"}
         
-        img_buffer = BytesIO()
-        image.save(img_buffer, format='JPEG')
+        img_buffer = encode_image(image) if isinstance(image, Image.Image) else image
         img_buffer.seek(0)
         
-        response = requests.post(imgur_url, headers=headers, files={'image': img_buffer})
+        response = requests.post(imgur_url, headers=headers, files={'image': ('image.jpg', img_buffer, 'image/jpeg')})
         response_data = response.json()
         
         if response_data['success']:
@@ -155,6 +184,137 @@ def upload_photo_to_imgur(image):
         logging.error(f"Imgur upload error: {e}")
         return None
 
+class HostedImageRequestHandler(BaseHTTPRequestHandler):
+    """Serves hosted JPEG images by content-hash name, and nothing else."""
+    IMAGE_PATH = re.compile(r'^/([0-9a-f]{64}\.jpg)$')
+
+    def send_image(self, include_body):
+        match = self.IMAGE_PATH.match(urlparse(self.path).path)
+        if not match:
+            self.send_error(404)
+            return
+        try:
+            with open(os.path.join(self.server.directory, match.group(1)), 'rb') as f:
+                data = f.read()
+        except OSError:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if include_body:
+            self.wfile.write(data)
+
+    def do_GET(self):
+        self.send_image(include_body=True)
+
+    def do_HEAD(self):
+        self.send_image(include_body=False)
+
+    def log_message(self, format, *args):
+        """Suppress logging of HTTP requests."""
+        return
+
+class ImgurImageHost:
+    """Hosts images on Imgur."""
+    def upload(self, image, article_url):
+        return upload_photo_to_imgur(encode_image(image))
+
+class LocalImageHost:
+    """Hosts images from a local file server using content-hash filenames."""
+    def __init__(self, base_url, directory=LOCAL_IMAGE_DIR, bind=LOCAL_IMAGE_BIND, retention=LOCAL_IMAGE_RETENTION):
+        self.base_url = base_url.rstrip('/')
+        self.directory = directory
+        self.bind = bind
+        self.retention = retention
+        self.server = None
+
+    def start(self):
+        """Start serving the image directory in a background thread, once."""
+        if self.server:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.server = ThreadingHTTPServer(self.bind, HostedImageRequestHandler)
+        self.server.directory = self.directory
+        server_thread = threading.Thread(target=self.server.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+        logging.info(f"Local image host serving {self.directory} on {self.bind[0]}:{self.bind[1]}")
+
+    def remove_expired(self):
+        """Delete images (and leftover temporary files) not used within the retention period."""
+        cutoff = time.time() - self.retention
+        for filename in os.listdir(self.directory):
+            path = os.path.join(self.directory, filename)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError as e:
+                logging.warning(f"Could not remove expired image {path}: {e}")
+
+    def upload(self, image, article_url):
+        try:
+            self.start()
+            self.remove_expired()
+            img_buffer = encode_image(image)
+            data = img_buffer.getbuffer()
+            try:
+                filename = f"{hashlib.sha256(data).hexdigest()}.jpg"
+                path = os.path.join(self.directory, filename)
+                # Identical images share a name, so an existing file is already hosted
+                if os.path.exists(path):
+                    os.utime(path)
+                else:
+                    fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+                    with os.fdopen(fd, 'wb') as f:
+                        f.write(data)
+                    os.replace(tmp_path, path)
+            finally:
+                data.release()
+            image_url = f"{self.base_url}/{filename}"
+            logging.info(f"Image hosted locally: {image_url}")
+            return image_url
+        except Exception as e:
+            logging.error(f"Local image hosting error: {e}")
+            return None
+
+class WordPressImageHost:
+    """
+    Reuses the featured image Part1 already uploaded to WordPress for the same
+    article, falling back to another host when the article is not there yet.
+    """
+    def __init__(self, media_urls_file=WORDPRESS_MEDIA_URLS_FILE, fallback=None):
+        self.media_urls_file = media_urls_file
+        self.fallback = fallback or ImgurImageHost()
+
+    def load_media_urls(self):
+        """Load the article link to media URL mapping written by Part1."""
+        try:
+            if os.path.exists(self.media_urls_file) and os.path.getsize(self.media_urls_file) > 0:
+                with open(self.media_urls_file, 'rb') as f:
+                    return dict(pickle.load(f))
+        except Exception as e:
+            logging.warning(f"Could not load WordPress media URLs: {e}")
+        return {}
+
+    def upload(self, image, article_url):
+        image_url = self.load_media_urls().get(article_url)
+        if image_url:
+            logging.info(f"Reusing WordPress image: {image_url}")
+            return image_url
+        return self.fallback.upload(image, article_url)
+
+def get_image_host(name=IMAGE_HOST):
+    """Create the image host backend selected by name."""
+    if name == "imgur":
+        return ImgurImageHost()
+    if name == "local":
+        return LocalImageHost(LOCAL_IMAGE_BASE_URL)
+    if name == "wordpress":
+        return WordPressImageHost()
+    raise ValueError(f"Unknown image host: {name}")
+
 def upload_photo_to_instagram(image_url, caption):
     """Upload photo to Instagram."""
     try:
@@ -198,28 +358,44 @@ def publish_photo(media_id):
         logging.error(f"Instagram publish error: {e}")
         return False
 
-def monitor_rss_feed(check_interval=300, max_entries_per_run=5):
+def monitor_rss_feed(check_interval=300, max_entries_per_run=5, image_host=None, feeds=None):
     """
-    Continuously monitor RSS feed for new entries.
+    Continuously monitor RSS feeds for new entries.
+    
+    Entries from all feeds are posted in freshness-deadline order, and the time
+    from each article's publish time to its Instagram post is reported.
     
     :param check_interval: Time between RSS feed checks (in seconds)
     :param max_entries_per_run: Maximum number of new entries to process in each run
+    :param image_host: Backend used to publish images (defaults to IMAGE_HOST)
+    :param feeds: Feed configurations to monitor (defaults to FEEDS)
     """
     processed_entries = load_processed_entries()
+    image_host = image_host or get_image_host()
+    feeds = feeds or FEEDS
+    scheduler = FreshnessScheduler()
     
     while True:
         try:
-            # Parse RSS feed
-            feed = feedparser.parse(FEED_URL)
-            logging.info(f"Checking RSS feed: {FEED_URL}")
+            # Parse RSS feeds and queue new entries by deadline
+            for feed_config in feeds:
+                logging.info(f"Checking RSS feed: {feed_config['url']}")
+                feed = feedparser.parse(feed_config['url'])
+                scheduler.add_feed(
+                    feed, feed_config['url'], INSTAGRAM_TARGET,
+                    priority=feed_config.get('priority', 0),
+                    slo=feed_config.get('slo'),
+                    skip=processed_entries,
+                )
             
             # Counter to limit entries processed in one run
             entries_processed = 0
             
-            for entry in feed.entries:
-                # Skip already processed entries
-                if entry.link in processed_entries:
-                    continue
+            while entries_processed < max_entries_per_run:
+                item = scheduler.pop(INSTAGRAM_TARGET)
+                if item is None:
+                    break
+                entry = item.entry
                 
                 # Extract article details
                 article_title = entry.title
@@ -234,8 +410,8 @@ def monitor_rss_feed(check_interval=300, max_entries_per_run=5):
                 image = generate_image(article_title, article_summary)
                 
                 if image:
-                    # Upload to Imgur
-                    image_url = upload_photo_to_imgur(image)
+                    # Publish image through the configured host
+                    image_url = image_host.upload(image, article_url)
                     
                     if image_url:
                         # Upload to Instagram
@@ -248,12 +424,12 @@ def monitor_rss_feed(check_interval=300, max_entries_per_run=5):
                                 processed_entries.add(entry.link)
                                 save_processed_entries(processed_entries)
                                 
-                                entries_processed += 1
+                                scheduler.record_published(item)
                                 
-                                # Stop if max entries processed
-                                if entries_processed >= max_entries_per_run:
-                                    break
+                                entries_processed += 1
                 
+            scheduler.log_report()
+            
             # Wait before next check
             logging.info(f"Waiting {check_interval} seconds before next check")
             time.sleep(check_interval)
@@ -267,8 +443,12 @@ if __name__ == "__main__":
     logging.info("RSS to Instagram Poster started")
     try:
         # Check and validate configurations
-        if not all([BITLY_API_KEY, ACCESS_TOKEN, USER_ID, IMGUR_CLIENT_ID]):
+        if not all([BITLY_API_KEY, ACCESS_TOKEN, USER_ID]) or (IMAGE_HOST in ("imgur", "wordpress") and not IMGUR_CLIENT_ID):
             logging.error("Please configure all API keys and tokens before running")
+        elif IMAGE_HOST not in IMAGE_HOSTS:
+            logging.error(f"IMAGE_HOST must be one of {', '.join(IMAGE_HOSTS)}")
+        elif IMAGE_HOST == "local" and not LOCAL_IMAGE_BASE_URL:
+            logging.error("Set LOCAL_IMAGE_BASE_URL to a public URL for the local image host")
         else:
             monitor_rss_feed()
     except KeyboardInterrupt:
@@ -0,0 +1,200 @@
+import calendar
+import logging
+import time
+from collections import deque
+
+
+class ScheduledEntry:
+    """A feed entry waiting to be posted to a target."""
+    def __init__(self, entry, feed_url, target, priority, published, deadline, timestamped):
+        self.entry = entry
+        self.feed_url = feed_url
+        self.target = target
+        self.priority = priority
+        self.published = published
+        self.deadline = deadline
+        self.timestamped = timestamped
+
+    @property
+    def key(self):
+        return (self.target, self.entry.link)
+
+
+class FreshnessScheduler:
+    """Orders feed entries across feeds and targets by freshness deadline."""
+    def __init__(self, default_slo=900, max_samples=1000):
+        """
+        Initializes the scheduler.
+
+        Args:
+            default_slo (int): Seconds allowed from an entry's publish time to
+                our post going live, used when a feed has no SLO of its own.
+            max_samples (int): Number of recent time-to-publish samples kept
+                per feed and per target.
+        """
+        self.default_slo = default_slo
+        self.max_samples = max_samples
+        self.pending = {}
+        self.samples = {}
+        self.missed = {}
+        self.untimed = {}
+
+    @staticmethod
+    def entry_timestamp(entry):
+        """
+        Returns the publish time of a feedparser entry.
+
+        Args:
+            entry: feedparser entry.
+
+        Returns:
+            float: Unix timestamp of publication, or None if the feed omits it.
+        """
+        for field in ('published_parsed', 'updated_parsed'):
+            parsed = entry.get(field)
+            if parsed:
+                # feedparser normalises these to UTC
+                return calendar.timegm(parsed)
+        return None
+
+    def add(self, entry, feed_url, target, priority=0, slo=None, now=None):
+        """
+        Queues an entry for a target unless it is already queued.
+
+        Entries without a usable timestamp (missing, or in the future) are
+        scheduled from the time they were queued, but their time-to-publish is
+        only counted, not included in the percentiles.
+
+        Args:
+            entry: feedparser entry.
+            feed_url (str): Feed the entry came from.
+            target (str): Destination the entry is posted to (e.g. "instagram").
+            priority (int): Higher priorities are served first.
+            slo (int, optional): Freshness SLO in seconds for this entry.
+            now (float, optional): Current time. Defaults to time.time().
+
+        Returns:
+            ScheduledEntry: The queued item.
+        """
+        now = now or time.time()
+        published = self.entry_timestamp(entry)
+        timestamped = published is not None and published <= now
+        if not timestamped:
+            published = now
+        deadline = published + (self.default_slo if slo is None else slo)
+        item = ScheduledEntry(entry, feed_url, target, priority, published, deadline, timestamped)
+        return self.pending.setdefault(item.key, item)
+
+    def add_feed(self, feed, feed_url, target, priority=0, slo=None, skip=()):
+        """
+        Queues every entry of a parsed feed whose link is not in skip.
+
+        Returns:
+            int: Number of entries queued.
+        """
+        count = 0
+        for entry in feed.entries:
+            if entry.get('link') and entry.link not in skip:
+                self.add(entry, feed_url, target, priority, slo)
+                count += 1
+        return count
+
+    def _rank(self, item, now):
+        # Entries that can still meet their deadline go first, by priority and
+        # then earliest deadline. Entries that already missed it are backlog and
+        # are served newest first so they do not hold up fresher stories.
+        if item.deadline >= now:
+            return (0, -item.priority, item.deadline)
+        return (1, -item.priority, -item.published)
+
+    def pop(self, target, now=None):
+        """
+        Removes and returns the most urgent queued entry for a target.
+
+        Args:
+            target (str): Target to take an entry for.
+            now (float, optional): Current time. Defaults to time.time().
+
+        Returns:
+            ScheduledEntry: Most urgent entry, or None if nothing is queued.
+        """
+        now = now or time.time()
+        candidates = [item for item in self.pending.values() if item.target == target]
+        if not candidates:
+            return None
+        item = min(candidates, key=lambda candidate: self._rank(candidate, now))
+        del self.pending[item.key]
+        return item
+
+    def record_published(self, item, published_at=None):
+        """
+        Records that an entry went live and returns its time-to-publish.
+
+        Args:
+            item (ScheduledEntry): Entry returned by pop.
+            published_at (float, optional): When the post went live. Defaults to now.
+
+        Returns:
+            float: Seconds between the entry's publish time and our post, or
+            None if the entry had no usable publish time.
+        """
+        published_at = published_at or time.time()
+        keys = (('feed', item.feed_url), ('target', item.target))
+        if not item.timestamped:
+            for key in keys:
+                self.untimed[key] = self.untimed.get(key, 0) + 1
+            logging.info(f"Posted {item.entry.link} from {item.feed_url} to {item.target} (no publish time in feed)")
+            return None
+
+        latency = max(0.0, published_at - item.published)
+        for key in keys:
+            self.samples.setdefault(key, deque(maxlen=self.max_samples)).append(latency)
+            if published_at > item.deadline:
+                self.missed[key] = self.missed.get(key, 0) + 1
+        logging.info(f"Posted {item.entry.link} from {item.feed_url} to {item.target} {latency:.0f}s after it was published")
+        return latency
+
+    @staticmethod
+    def percentile(values, pct):
+        """Returns the pct-th percentile of values using linear interpolation."""
+        ordered = sorted(values)
+        if not ordered:
+            return None
+        rank = (len(ordered) - 1) * pct / 100
+        low = int(rank)
+        high = min(low + 1, len(ordered) - 1)
+        return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+    def report(self, percentiles=(50, 90, 99)):
+        """
+        Summarises time-to-publish per feed and per target.
+
+        Returns:
+            dict: Maps ("feed", url) and ("target", name) to a dict with the
+            sample count, SLO misses, posts without a publish time ("untimed")
+            and each requested percentile in seconds.
+        """
+        summary = {}
+        for key in set(self.samples) | set(self.untimed):
+            values = self.samples.get(key, ())
+            stats = {
+                'count': len(values),
+                'missed': self.missed.get(key, 0),
+                'untimed': self.untimed.get(key, 0),
+            }
+            for pct in percentiles:
+                stats[f'p{pct}'] = self.percentile(values, pct)
+            summary[key] = stats
+        return summary
+
+    def log_report(self):
+        """Logs the time-to-publish summary."""
+        for (kind, name), stats in sorted(self.report().items()):
+            latencies = ", ".join(
+                f"{label}={value:.0f}s" for label, value in stats.items()
+                if label.startswith('p') and value is not None
+            )
+            logging.info(
+                f"Time to publish for {kind} {name}: {latencies or 'no samples'} "
+                f"({stats['count']} posts, {stats['missed']} missed SLO, {stats['untimed']} without publish time)"
+            )
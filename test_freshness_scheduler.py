@@ -0,0 +1,81 @@
+import time
+import unittest
+
+from freshness_scheduler import FreshnessScheduler
+
+NOW = 1_700_000_000
+
+
+class Entry(dict):
+    """Minimal stand-in for a feedparser entry."""
+    def __getattr__(self, name):
+        return self[name]
+
+
+def entry(link, age=None):
+    """Build an entry published age seconds before NOW (no timestamp if age is None)."""
+    if age is None:
+        return Entry(link=link)
+    return Entry(link=link, published_parsed=time.gmtime(NOW - age))
+
+
+class FreshnessSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = FreshnessScheduler(default_slo=900)
+
+    def add(self, link, age, target="instagram", priority=0):
+        return self.scheduler.add(entry(link, age), "feed", target, priority, now=NOW)
+
+    def drain(self, target="instagram"):
+        links = []
+        while True:
+            item = self.scheduler.pop(target, now=NOW)
+            if item is None:
+                return links
+            links.append(item.entry.link)
+
+    def test_on_time_entries_go_by_priority_then_earliest_deadline(self):
+        self.add("fresh", 60)
+        self.add("older", 600)
+        self.add("urgent", 100, priority=5)
+        self.assertEqual(self.drain(), ["urgent", "older", "fresh"])
+
+    def test_missed_entries_are_backlog_served_newest_first(self):
+        self.add("stale", 5000)
+        self.add("less-stale", 2000)
+        self.add("fresh", 60)
+        self.assertEqual(self.drain(), ["fresh", "less-stale", "stale"])
+
+    def test_targets_are_kept_apart_and_duplicates_ignored(self):
+        self.add("a", 60, target="wordpress:site")
+        self.add("a", 60)
+        self.add("a", 30)
+        self.assertEqual(self.drain(), ["a"])
+        self.assertEqual(self.drain("wordpress:site"), ["a"])
+
+    def test_percentile_interpolates(self):
+        values = [40, 10, 30, 20]
+        self.assertEqual(FreshnessScheduler.percentile(values, 0), 10)
+        self.assertEqual(FreshnessScheduler.percentile(values, 50), 25)
+        self.assertEqual(FreshnessScheduler.percentile(values, 100), 40)
+        self.assertIsNone(FreshnessScheduler.percentile([], 50))
+
+    def test_report_counts_slo_misses_per_feed_and_target(self):
+        self.scheduler.record_published(self.add("on-time", 100), published_at=NOW)
+        self.scheduler.record_published(self.add("late", 100), published_at=NOW + 1000)
+        report = self.scheduler.report()
+        for key in (("feed", "feed"), ("target", "instagram")):
+            self.assertEqual(report[key]["count"], 2)
+            self.assertEqual(report[key]["missed"], 1)
+            self.assertEqual(report[key]["p50"], 600)
+
+    def test_entries_without_publish_time_stay_out_of_percentiles(self):
+        self.assertIsNone(self.scheduler.record_published(self.add("untimed", None), published_at=NOW + 50))
+        future = self.scheduler.add(entry("future", -3600), "feed", "instagram", now=NOW)
+        self.assertIsNone(self.scheduler.record_published(future, published_at=NOW + 50))
+        stats = self.scheduler.report()[("target", "instagram")]
+        self.assertEqual((stats["count"], stats["untimed"], stats["p50"]), (0, 2, None))
+
+
+if __name__ == "__main__":
+    unittest.main()